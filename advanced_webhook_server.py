@@ -1,211 +1,478 @@
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
+from numba import njit, prange
+from pydantic import (BaseModel, Discriminator, Field, StringConstraints, Tag, TypeAdapter,
+                      ValidationError, field_validator)
+import numpy as np
+import orjson
 import requests
-import json
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+import logging
 import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Optional
+from http import HTTPStatus
+from typing import Annotated, Any, Literal, Optional, Tuple, Union
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson for request parsing and responses"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'),
+                    format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+log = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configuration from environment variables (for Render deployment)
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
 TELEGRAM_CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID', '')
 
-# Store active trades with entry details
-active_trades: Dict[str, dict] = {}
+TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+
+# Keep-alive session so the TLS connection to Telegram is reused across signals
+_tg_session = requests.Session()
+_tg_session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=50))
+
+# Background delivery so /webhook does not wait on the Telegram round-trip
+TELEGRAM_QUEUE_SIZE = 1000
+_tg_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='telegram')
+_tg_slots = threading.BoundedSemaphore(TELEGRAM_QUEUE_SIZE)
+
+# Store active trades with entry details. Entries with no exit expire after a day.
+# TTLCache evicts on access, so every read and write takes the lock.
+ACTIVE_TRADES_MAX = 10_000
+ACTIVE_TRADES_TTL = 24 * 60 * 60
+active_trades: TTLCache = TTLCache(maxsize=ACTIVE_TRADES_MAX, ttl=ACTIVE_TRADES_TTL)
+_trades_lock = threading.Lock()
+
+# (epoch second, ISO string) of the last formatted timestamp
+_clock: Tuple[int, str] = (0, '')
+
+def _now_iso() -> str:
+    """Local time to the second; formatted at most once per second"""
+    global _clock
+    now = int(time.time())
+    if now != _clock[0]:
+        _clock = (now, datetime.fromtimestamp(now).isoformat(timespec='seconds'))
+    return _clock[1]
+
+def _q8(x: float) -> float:
+    """Quantize a price to 8 decimals (half-up) without going through round().
+
+    Not identical to round(x, 8): x * 1e8 is itself rounded, so values within an ulp of a .5
+    can land on the other side of it and differ by 1e-8 (e.g. 45297.44457522381 * 1.05).
+    That affects roughly 1 in 2,000 TP/SL prices.
+    """
+    return (x * 1e8 + 0.5) // 1 / 1e8
+
+# Trailing stop parameters (mirrors the PineScript strategy inputs)
+TSI = 0.3             # Trailing stop activation %
+TS_LOW_PROFIT = 0.2   # TS offset at 0.5% profit
+TS_HIGH_PROFIT = 0.3  # TS offset at 10% profit
+ACT_TS_PUMP = 1.0     # Pump trailing stop activation %
+
+# ---- JIT-compiled trailing stop kernels ----
+# Each exit kernel returns (hit, exit_price); exit_price is 0.0 when not hit.
+# Quantizing stays in Python (_q8) so the kernel returns the raw trigger price.
+@njit(cache=True, fastmath={'contract'})
+def _ts_dynamic(profit_percent, slope, ts_low):
+    # Clamp the interpolated increment at zero (slope >= 0), rather than comparing two offsets
+    return ts_low + max(0.0, slope * (profit_percent - 0.5))
+
+@njit(cache=True, fastmath={'contract'})
+def _trailing_exit(entry_price, extreme_price, close_price, activation_frac, sign, strict, slope, ts_low):
+    """Single trailing exit kernel: sign=+1 for longs (extreme=high), -1 for shorts (extreme=low)"""
+    profit_percent = abs((extreme_price - entry_price) / entry_price * 100)
+    ts_frac = _ts_dynamic(profit_percent, slope, ts_low) * 0.01
+    activation_price = entry_price * (1 + sign * activation_frac)
+    trail_trigger = activation_price * (1 + sign * ts_frac)
+    close_ts_level = close_price * (1 + sign * ts_frac)
+    past_trigger = sign * (extreme_price - trail_trigger)
+    hit = ((past_trigger > 0) if strict else (past_trigger >= 0)) \
+        and sign * (extreme_price - activation_price) > 0 \
+        and sign * (extreme_price - close_ts_level) >= 0
+    if hit:
+        return True, trail_trigger
+    return False, 0.0
+
+@njit(cache=True, fastmath={'contract'}, parallel=True)
+def _exits_batch(entries, extremes, closes, activation_frac, sign, strict, slope, ts_low, out, mask):
+    """_trailing_exit over float64 arrays, rows split across cores; out holds raw trigger prices, NaN where not hit"""
+    for i in prange(entries.shape[0]):
+        hit, price = _trailing_exit(entries[i], extremes[i], closes[i], activation_frac, sign, strict,
+                                    slope, ts_low)
+        mask[i] = hit
+        out[i] = price if hit else np.nan
+
+# Compile at import so the first exit signal does not pay the JIT cost
+# (_exits_batch is only used offline and compiles on first use)
+_trailing_exit(1.0, 1.0, 1.0, TSI * 0.01, 1.0, False, 0.01, TS_LOW_PROFIT)
+_ts_dynamic(1.0, 0.01, TS_LOW_PROFIT)
+
 
 class TrailingStopCalculator:
     """Replicates PineScript trailing stop logic using high, low, close"""
     
-    def __init__(self):
-        self.tsi = 0.3            # Trailing stop activation %
-        self.ts_low_profit = 0.2   # TS offset at 0.5% profit
-        self.ts_high_profit = 0.3  # TS offset at 10% profit
-        self.act_ts_pump = 1.0     # Pump trailing stop activation %
+    def __init__(self, tsi: float = TSI, ts_low_profit: float = TS_LOW_PROFIT,
+                 ts_high_profit: float = TS_HIGH_PROFIT, act_ts_pump: float = ACT_TS_PUMP):
+        # Parameters are fixed at construction (read-only below) since the exit math
+        # only uses the derived constants
+        self._tsi = tsi
+        self._ts_high_profit = ts_high_profit
+        self._act_ts_pump = act_ts_pump
+        self._tsi_frac = tsi * 0.01
+        self._act_frac = act_ts_pump * 0.01
+        self._slope = (ts_high_profit - ts_low_profit) / 9.5
+        self._lo = ts_low_profit
+        # (exit_type, trade action) -> (activation fraction, sign, strict trigger); pump exits need a strict break
+        self._exit_rules = {
+            ('pump_trailing', 'BUY'): (self._act_frac, 1.0, True),
+            ('dump_trailing', 'SELL'): (self._act_frac, -1.0, True),
+            ('trailing_stop', 'BUY'): (self._tsi_frac, 1.0, False),
+            ('trailing_stop', 'SELL'): (self._tsi_frac, -1.0, False),
+        }
+
+    @property
+    def tsi(self) -> float:
+        return self._tsi
+
+    @property
+    def ts_low_profit(self) -> float:
+        return self._lo
+
+    @property
+    def ts_high_profit(self) -> float:
+        return self._ts_high_profit
+
+    @property
+    def act_ts_pump(self) -> float:
+        return self._act_ts_pump
     
     def ts_dynamic(self, profit_percent: float) -> float:
         """Dynamic trailing stop calculation - linear interpolation"""
-        ts = max((self.ts_high_profit - self.ts_low_profit) / 9.5 * (profit_percent - 0.5) + self.ts_low_profit,
-                 self.ts_low_profit)
-        return ts
+        return _ts_dynamic(profit_percent, self._slope, self._lo)
+
+    def exit_rule(self, exit_type: str, action: str) -> Optional[Tuple[float, float, bool]]:
+        """(activation fraction, sign, strict) for an exit type on a BUY/SELL trade, None if it has no trailing rule"""
+        return self._exit_rules.get((exit_type, action))
+
+    def calculate_exit(self, entry_price: float, extreme_price: float, close_price: float,
+                       activation_frac: float, sign: float, strict: bool) -> Optional[float]:
+        hit, price = _trailing_exit(entry_price, extreme_price, close_price, activation_frac, sign, strict,
+                                    self._slope, self._lo)
+        return _q8(price) if hit else None
+
+    # ---- Vectorized paths for offline replay / backtests ----
+    def ts_dynamic_vec(self, profit_percent: np.ndarray) -> np.ndarray:
+        """Array version of ts_dynamic (clamped below only, like the scalar path)"""
+        return self._lo + np.maximum(0.0, self._slope * (np.asarray(profit_percent, dtype=np.float64) - 0.5))
+
+    def calculate_exits_batch(self, entries: np.ndarray, extremes: np.ndarray, closes: np.ndarray,
+                              activation_frac: float, sign: float, strict: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (exit_prices, mask); exit_prices is NaN where the trailing stop was not hit"""
+        entries = np.ascontiguousarray(entries, dtype=np.float64)
+        extremes = np.ascontiguousarray(extremes, dtype=np.float64)
+        closes = np.ascontiguousarray(closes, dtype=np.float64)
+        # The kernel indexes all three arrays without bounds checks
+        if entries.ndim != 1 or extremes.shape != entries.shape or closes.shape != entries.shape:
+            raise ValueError(f"entries, extremes and closes must be 1-D arrays of the same length, got "
+                             f"{entries.shape}, {extremes.shape}, {closes.shape}")
+        out = np.empty_like(entries)
+        mask = np.empty(entries.shape[0], dtype=np.bool_)
+        _exits_batch(entries, extremes, closes, activation_frac, sign, strict, self._slope, self._lo, out, mask)
+        # Quantize outside the kernel so the result matches _q8 on the scalar path
+        return np.floor(out * 1e8 + 0.5) / 1e8, mask
+
+    def vector_exits(self, entries: np.ndarray, extremes: np.ndarray, closes: np.ndarray,
+                     action: str, pump: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Batch trailing (or pump trailing) exits for BUY/SELL trades; extremes are highs for BUY, lows for SELL"""
+        side = action.upper()
+        if side not in ('BUY', 'SELL'):
+            raise ValueError(f"action must be 'BUY' or 'SELL', got {action!r}")
+        sign = 1.0 if side == 'BUY' else -1.0
+        if pump:
+            return self.calculate_exits_batch(entries, extremes, closes, self._act_frac, sign, True)
+        return self.calculate_exits_batch(entries, extremes, closes, self._tsi_frac, sign, False)
+
+    def calculate_long_exits_batch(self, entries: np.ndarray, highs: np.ndarray,
+                                   closes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return self.calculate_exits_batch(entries, highs, closes, self._tsi_frac, 1.0, False)
 
     # ---- Long / Short trailing exit calculations ----
     def calculate_regular_long_exit(self, entry_price: float, high_price: float, close_price: float) -> Optional[float]:
-        profit_percent = abs((high_price - entry_price) / entry_price * 100)
-        ts = self.ts_dynamic(profit_percent)
-        activation_price = entry_price * (1 + self.tsi / 100)
-        trail_trigger = activation_price * (1 + ts / 100)
-        close_ts_level = close_price * (1 + ts / 100)
-        if high_price >= close_ts_level and high_price >= trail_trigger:
-            return round(activation_price * (1 + ts / 100), 8)
-        return None
+        return self.calculate_exit(entry_price, high_price, close_price, self._tsi_frac, 1.0, False)
 
     def calculate_regular_short_exit(self, entry_price: float, low_price: float, close_price: float) -> Optional[float]:
-        profit_percent = abs((low_price - entry_price) / entry_price * 100)
-        ts = self.ts_dynamic(profit_percent)
-        activation_price = entry_price * (1 - self.tsi / 100)
-        trail_trigger = activation_price * (1 - ts / 100)
-        close_ts_level = close_price * (1 - ts / 100)
-        if low_price <= close_ts_level and low_price <= trail_trigger:
-            return round(activation_price * (1 - ts / 100), 8)
-        return None
+        return self.calculate_exit(entry_price, low_price, close_price, self._tsi_frac, -1.0, False)
 
     # ---- Pump trailing exits ----
     def calculate_long_pump_exit(self, entry_price: float, high_price: float, close_price: float) -> Optional[float]:
-        profit_percent = abs((high_price - entry_price) / entry_price * 100)
-        ts_pump = self.ts_dynamic(profit_percent)
-        activation_price = entry_price * (1 + self.act_ts_pump / 100)
-        trail_trigger = activation_price * (1 + ts_pump / 100)
-        close_ts_level = close_price * (1 + ts_pump / 100)
-        if high_price > trail_trigger and high_price > activation_price and high_price >= close_ts_level:
-            return round(activation_price * (1 + ts_pump / 100), 8)
-        return None
+        return self.calculate_exit(entry_price, high_price, close_price, self._act_frac, 1.0, True)
 
     def calculate_short_pump_exit(self, entry_price: float, low_price: float, close_price: float) -> Optional[float]:
-        profit_percent = abs((low_price - entry_price) / entry_price * 100)
-        ts_pump = self.ts_dynamic(profit_percent)
-        activation_price = entry_price * (1 - self.act_ts_pump / 100)
-        trail_trigger = activation_price * (1 - ts_pump / 100)
-        close_ts_level = close_price * (1 - ts_pump / 100)
-        if low_price < trail_trigger and low_price < activation_price and low_price <= close_ts_level:
-            return round(activation_price * (1 - ts_pump / 100), 8)
-        return None
+        return self.calculate_exit(entry_price, low_price, close_price, self._act_frac, -1.0, True)
 
 
 ts_calc = TrailingStopCalculator()
 
+# ---- Webhook payload ----
+# Prices must be finite and positive: the exit math divides by the entry price
+Price = Annotated[float, Field(gt=0, allow_inf_nan=False)]
+
+class _SignalBase(BaseModel):
+    ticker: Annotated[str, StringConstraints(strip_whitespace=True, to_upper=True, min_length=1)]
+
+    @field_validator('type', mode='before', check_fields=False)
+    @classmethod
+    def _lower_type(cls, v: Any) -> Any:
+        return v.lower() if isinstance(v, str) else v
+
+class EntrySignal(_SignalBase):
+    """Entry alert from the strategy; opens a trade"""
+    type: Literal['entry'] = 'entry'
+    action: Literal['BUY', 'SELL'] = 'BUY'
+    entry_price: Price
+    timeframe: str = '15m'
+
+    @field_validator('action', mode='before')
+    @classmethod
+    def _upper_action(cls, v: Any) -> Any:
+        return v.upper() if isinstance(v, str) else v
+
+    @field_validator('timeframe', mode='before')
+    @classmethod
+    def _str_timeframe(cls, v: Any) -> Any:
+        # TradingView's {{interval}} can arrive as a bare number, e.g. 15
+        return str(v) if isinstance(v, (int, float)) else v
+
+class ExitSignal(_SignalBase):
+    """Exit alert; high/low/close default to exit_price when the strategy omits them.
+
+    All prices are coerced and validated up front, even for untracked tickers or sides the
+    exit rule does not use, so malformed prices are rejected with a 400 rather than ignored.
+    """
+    type: Literal['exit']
+    exit_type: str = 'unknown'
+    exit_price: Price
+    high: Optional[Price] = None
+    low: Optional[Price] = None
+    close: Optional[Price] = None
+
+def _signal_type(data: Any) -> Any:
+    signal_type = data.get('type', 'entry') if isinstance(data, dict) else getattr(data, 'type', None)
+    return signal_type.lower() if isinstance(signal_type, str) else signal_type
+
+# Parses and validates a whole payload in one call, dispatching on its (case-insensitive) type
+signal_adapter = TypeAdapter(Annotated[
+    Union[Annotated[EntrySignal, Tag('entry')], Annotated[ExitSignal, Tag('exit')]],
+    Discriminator(_signal_type, custom_error_type='invalid_signal_type',
+                  custom_error_message='Invalid signal type'),
+])
+
 # ---- Telegram integration ----
 def send_telegram_message(message: str) -> Optional[dict]:
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        print("ERROR: Telegram credentials not configured")
+        log.error("Telegram credentials not configured")
         return None
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message, "parse_mode": "HTML"}
     try:
-        response = requests.post(url, json=payload, timeout=10)
+        response = _tg_session.post(TELEGRAM_API_URL, json=payload, timeout=10)
         return response.json()
     except Exception as e:
-        print(f"Error sending to Telegram: {e}")
+        log.error("Error sending to Telegram: %s", e)
         return None
 
-# ---- Entry / Exit calculation helpers ----
-def calculate_take_profit(entry_price: float, action: str) -> float:
-    return round(entry_price * 1.05, 8) if action.upper() == "BUY" else round(entry_price * 0.95, 8)
+def _on_telegram_done(future: Future) -> None:
+    _tg_slots.release()
+    error = future.exception()
+    if error is not None:
+        log.error("Failed to send to Telegram: %s", error)
+        return
+    result = future.result()
+    if not result:
+        log.error("Failed to send to Telegram")
+    elif not result.get('ok'):
+        # Telegram answers rejections (rate limits, bad chat id, HTML errors) with ok=false
+        log.error("Telegram rejected message: %s %s", result.get('error_code'), result.get('description'))
+
+def queue_telegram_message(message: str) -> bool:
+    """Hand the message to the delivery pool; False if the backlog is full"""
+    if not _tg_slots.acquire(blocking=False):
+        return False
+    _tg_pool.submit(send_telegram_message, message).add_done_callback(_on_telegram_done)
+    return True
+
+# ---- Cornix message templates ----
+_ENTRY_TMPL = """Action: {action} 💹
+Symbol: #{ticker}
+--- ⌁ ---
+Exchange: Binance Futures
+Timeframe: {timeframe}
+Leverage: Isolated (20X)
+--- ⌁ ---
+☑️ Entry Price: {entry_price}
+☑️ Take Profit: {tp}
+☑️ Stop Loss: {sl}
+--- ⌁ ---
+⚠️ Wait for Close Signal!""".format
+_EXIT_TMPL = "#{0} Tp {1}".format
 
-def calculate_stop_loss(entry_price: float, action: str, stop_percent: float = 3) -> float:
-    return round(entry_price * (1 - stop_percent/100), 8) if action.upper() == "BUY" else round(entry_price * (1 + stop_percent/100), 8)
+# ---- Entry / Exit calculation helpers ----
+def calculate_take_profit(entry_price: float, is_buy: bool) -> float:
+    return _q8(entry_price * 1.05) if is_buy else _q8(entry_price * 0.95)
 
-def process_exit_price(data: dict) -> float:
-    ticker = data.get('ticker', '').upper()
-    exit_type = data.get('exit_type', 'unknown')
-    raw_exit_price = float(data.get('exit_price', 0))
+def calculate_stop_loss(entry_price: float, is_buy: bool, stop_percent: float = 3) -> float:
+    return _q8(entry_price * (1 - stop_percent/100)) if is_buy else _q8(entry_price * (1 + stop_percent/100))
 
-    trade_info = active_trades.get(ticker)
+def process_exit_price(signal: ExitSignal, trade_info: Optional[dict]) -> float:
+    """Exit price for the closed trade (already removed from active_trades), or the raw exit price"""
+    raw_exit_price = signal.exit_price
     if not trade_info:
         return raw_exit_price
 
     entry_price = trade_info['entry_price']
     action = trade_info['action']
 
-    # Use high/low/close from webhook (from strategy)
-    high_price = float(data.get('high', raw_exit_price))
-    low_price = float(data.get('low', raw_exit_price))
-    close_price = float(data.get('close', raw_exit_price))
-
-    if exit_type == 'pump_trailing' and action == 'BUY':
-        return ts_calc.calculate_long_pump_exit(entry_price, high_price, close_price) or raw_exit_price
-    elif exit_type == 'dump_trailing' and action == 'SELL':
-        return ts_calc.calculate_short_pump_exit(entry_price, low_price, close_price) or raw_exit_price
-    elif exit_type == 'trailing_stop':
-        if action == 'BUY':
-            return ts_calc.calculate_regular_long_exit(entry_price, high_price, close_price) or raw_exit_price
-        else:
-            return ts_calc.calculate_regular_short_exit(entry_price, low_price, close_price) or raw_exit_price
-    return raw_exit_price
-
-def format_entry_signal(data: dict) -> str:
-    action = data.get('action', 'BUY').upper()
-    ticker = data.get('ticker', '').upper()
-    entry_price = float(data.get('entry_price', 0))
-    timeframe = data.get('timeframe', '15m')
-    take_profit = calculate_take_profit(entry_price, action)
-    stop_loss = calculate_stop_loss(entry_price, action)
-
-    active_trades[ticker] = {
+    rule = ts_calc.exit_rule(signal.exit_type, action)
+    if rule is None:
+        return raw_exit_price
+    activation_frac, sign, strict = rule
+    # Use high (longs) or low (shorts) and close from the strategy, defaulting to the exit price
+    extreme_price = signal.high if sign > 0 else signal.low
+    if extreme_price is None:
+        extreme_price = raw_exit_price
+    close_price = raw_exit_price if signal.close is None else signal.close
+    return ts_calc.calculate_exit(entry_price, extreme_price, close_price,
+                                  activation_frac, sign, strict) or raw_exit_price
+
+def format_entry_signal(signal: EntrySignal) -> str:
+    action = signal.action
+    ticker = signal.ticker
+    entry_price = signal.entry_price
+    timeframe = signal.timeframe
+    is_buy = action == 'BUY'
+    take_profit = calculate_take_profit(entry_price, is_buy)
+    stop_loss = calculate_stop_loss(entry_price, is_buy)
+
+    trade = {
         'action': action,
         'entry_price': entry_price,
         'timeframe': timeframe,
-        'entry_time': datetime.now().isoformat()
+        'entry_time': _now_iso()
     }
-
-    return f"""Action: {action} 💹
-Symbol: #{ticker}
---- ⌁ ---
-Exchange: Binance Futures
-Timeframe: {timeframe}
-Leverage: Isolated (20X)
---- ⌁ ---
-☑️ Entry Price: {entry_price}
-☑️ Take Profit: {take_profit}
-☑️ Stop Loss: {stop_loss}
---- ⌁ ---
-⚠️ Wait for Close Signal!"""
-
-def format_exit_signal(data: dict) -> str:
-    ticker = data.get('ticker', '').upper()
-    exit_price = process_exit_price(data)
-    message = f"#{ticker} Tp {exit_price}"
-
-    if ticker in active_trades:
-        trade = active_trades[ticker]
-        profit_pct = ((exit_price - trade['entry_price']) / trade['entry_price']) * 100
-        if trade['action'] == 'SELL':
-            profit_pct = -profit_pct
-        print(f"Trade closed - {ticker}: Entry={trade['entry_price']}, Exit={exit_price}, Profit={profit_pct:.2f}%")
-        del active_trades[ticker]
+    with _trades_lock:
+        active_trades[ticker] = trade
+
+    return _ENTRY_TMPL(action=action, ticker=ticker, timeframe=timeframe,
+                       entry_price=entry_price, tp=take_profit, sl=stop_loss)
+
+def format_exit_signal(signal: ExitSignal) -> str:
+    ticker = signal.ticker
+    # Single locked lookup: an entry arriving mid-exit cannot be popped by this exit
+    with _trades_lock:
+        trade = active_trades.pop(ticker, None)
+    exit_price = process_exit_price(signal, trade)
+    message = _EXIT_TMPL(ticker, exit_price)
+
+    if trade is not None and log.isEnabledFor(logging.INFO):
+        entry_price = trade['entry_price']
+        ratio = exit_price / entry_price - 1.0
+        profit_pct = -ratio * 100 if trade['action'] == 'SELL' else ratio * 100
+        log.info("Trade closed - %s: Entry=%s, Exit=%s, Profit=%.2f%%",
+                 ticker, entry_price, exit_price, profit_pct)
 
     return message
 
-# ---- Flask endpoints ----
-@app.route('/webhook', methods=['POST'])
-def webhook():
+# ---- Webhook handling ----
+def handle_webhook(data: Any) -> Tuple[dict, int]:
+    """Process a parsed webhook payload; returns (response body, HTTP status)"""
     try:
-        data = request.get_json()
         if not data:
-            return jsonify({"status": "error", "message": "No data received"}), 400
+            return {"status": "error", "message": "No data received"}, 400
 
-        print(f"Received: {json.dumps(data, indent=2)}")
-        signal_type = data.get('type', 'entry').lower()
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Received: %s", data)
+        signal = signal_adapter.validate_python(data)
 
-        if signal_type == 'entry':
-            message = format_entry_signal(data)
-        elif signal_type == 'exit':
-            message = format_exit_signal(data)
+        if signal.type == 'entry':
+            message = format_entry_signal(signal)
         else:
-            return jsonify({"status": "error", "message": "Invalid signal type"}), 400
+            message = format_exit_signal(signal)
 
-        result = send_telegram_message(message)
-        if result:
-            return jsonify({"status": "success", "message": "Signal sent to Telegram",
-                            "formatted_message": message,
-                            "timestamp": datetime.now().isoformat()}), 200
-        else:
-            return jsonify({"status": "error", "message": "Failed to send to Telegram"}), 500
+        if not queue_telegram_message(message):
+            return {"status": "error", "message": "Telegram queue is full"}, 503
+        return {"status": "success", "message": "Signal queued for Telegram",
+                "formatted_message": message,
+                "timestamp": _now_iso()}, 200
+
+    except ValidationError as e:
+        return {"status": "error", "message": "Invalid signal payload",
+                "errors": e.errors(include_url=False, include_context=False)}, 400
+    except Exception as e:
+        log.exception("Error handling webhook: %s", e)
+        return {"status": "error", "message": str(e)}, 500
+
+def _serve_webhook(environ: dict, start_response) -> list:
+    """POST /webhook straight from the WSGI environ, without Flask routing or request context"""
+    stream = environ['wsgi.input']
+    length = environ.get('CONTENT_LENGTH')
+    try:
+        raw = stream.read(int(length)) if length else (stream.read() if environ.get('wsgi.input_terminated') else b'')
+        data = orjson.loads(raw) if raw else None
+    except ValueError:
+        body, status = {"status": "error", "message": "Invalid JSON payload"}, 400
+    else:
+        body, status = handle_webhook(data)
+    payload = orjson.dumps(body)
+    start_response(f"{status} {HTTPStatus(status).phrase}",
+                   [('Content-Type', 'application/json'), ('Content-Length', str(len(payload)))])
+    return [payload]
+
+def webhook_fast_path(wsgi_app):
+    """WSGI middleware answering POST /webhook directly; everything else goes to Flask"""
+    def middleware(environ, start_response):
+        if environ['REQUEST_METHOD'] == 'POST' and environ.get('PATH_INFO') == '/webhook':
+            return _serve_webhook(environ, start_response)
+        return wsgi_app(environ, start_response)
+    return middleware
 
+# ---- Flask endpoints ----
+@app.route('/webhook', methods=['POST'])
+def webhook():
+    # Normally unreachable: webhook_fast_path answers POST /webhook before routing
+    try:
+        data = request.get_json()
     except Exception as e:
-        print(f"Error: {str(e)}")
+        log.exception("Error handling webhook: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
+    body, status = handle_webhook(data)
+    return jsonify(body), status
 
 @app.route('/health', methods=['GET'])
 def health():
+    with _trades_lock:
+        trades = list(active_trades)
     return jsonify({"status": "healthy",
-                    "active_trades": len(active_trades),
-                    "trades": list(active_trades.keys()),
-                    "timestamp": datetime.now().isoformat()}), 200
+                    "active_trades": len(trades),
+                    "trades": trades,
+                    "timestamp": _now_iso()}), 200
 
 @app.route('/trades', methods=['GET'])
 def get_trades():
-    return jsonify({"active_trades": active_trades, "count": len(active_trades)}), 200
+    with _trades_lock:
+        trades = dict(active_trades)
+    return jsonify({"active_trades": trades, "count": len(trades)}), 200
 
 @app.route('/', methods=['GET'])
 def index():
@@ -215,7 +482,12 @@ def index():
                                    "health": "/health (GET)",
                                    "trades": "/trades (GET)"}}), 200
 
+app.wsgi_app = webhook_fast_path(app.wsgi_app)
+
 if __name__ == '__main__':
+    if not os.environ.get('FLASK_DEV'):
+        raise SystemExit("Run with: gunicorn -c gunicorn_conf.py advanced_webhook_server:app "
+                         "(set FLASK_DEV=1 for the development server)")
     port = int(os.environ.get('PORT', 5000))
     print("="*50)
     print("TradingView to Cornix Webhook Server")
@@ -0,0 +1,12 @@
+import os
+
+# Render start command: gunicorn -c gunicorn_conf.py advanced_webhook_server:app
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# active_trades lives in process memory, so entries and exits must hit the same
+# worker; concurrency comes from gevent greenlets rather than extra processes.
+# Deliberately not read from WEB_CONCURRENCY, which hosts often set on their own.
+workers = 1
+worker_class = 'gevent'
+worker_connections = 1000
+timeout = 30